@@ -1,32 +1,78 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Iterator
 from datetime import datetime
 import json
 import re
 import os
-from openai import OpenAI
 import time
 from datetime import datetime, timedelta
-import googlemaps
 from dotenv import load_dotenv  # Import dotenv
 import random
+import asyncio
+import contextvars
+import itertools
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from src.json_stream import JsonArrayStreamParser
+from src.admission import AdmissionController, AdmissionRejected
+from src.http_cache import json_response, project_fields, read_json_cached
+from src.cost_accounting import CostLedger, QuotaExceeded, current_conversation, FULL, REDUCED, MINIMAL, EXHAUSTED
+from src.venue_catalog import VenueCatalog
+from src.ttl_cache import TTLCache
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+# Upstream clients are created on first use (or by the warmup hook) and reused afterwards,
+# so importing this module doesn't pay for the openai and googlemaps imports
+openai_client = None
+gmaps_client = None
+clients_lock = threading.Lock()
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+def get_openai_client():
+    global openai_client
+    if openai_client is None:
+        with clients_lock:
+            if openai_client is None:
+                from openai import OpenAI
+                openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return openai_client
 
-gmaps = googlemaps.Client(key=os.getenv('GOOGLE_API_KEY')) #look in whatsapp for key
+def get_gmaps():
+    global gmaps_client
+    if gmaps_client is None:
+        with clients_lock:
+            if gmaps_client is None:
+                import googlemaps
+                gmaps_client = googlemaps.Client(key=os.getenv('GOOGLE_API_KEY')) #look in whatsapp for key
+    return gmaps_client
 
-# Clear conversations periodically (optional)
-@app.on_event("startup")
-async def startup_event():
+def warmup():
+    """Create the upstream clients ahead of the first request"""
+    get_openai_client()
+    get_gmaps()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clear conversations periodically (optional)
     conversations.clear()
+    if os.getenv("WARMUP_ON_STARTUP", "").lower() in ("1", "true", "yes"):
+        await asyncio.to_thread(warmup)
+    yield
+    global openai_client, gmaps_client
+    if openai_client is not None:
+        openai_client.close()
+        openai_client = None
+    if gmaps_client is not None:
+        gmaps_client.session.close()
+        gmaps_client = None
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +82,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Conversations idle for longer than this are treated as abandoned
+CONVERSATION_TTL = timedelta(minutes=30)
+
+# Number of venues requested speculatively, so the list can be narrowed once attendees are known
+SPECULATIVE_VENUE_COUNT = 15
+RECOMMENDED_VENUE_COUNT = 9
+
+# Catalog venues only count as a fit up to this many times the number of attendees
+MAX_CAPACITY_FACTOR = 4
+
+# Venues enriched with Maps data at the same time
+ENRICHMENT_WORKERS = 4
+
+# Admission control for the final chat step (one LLM completion plus dozens of Maps calls).
+# Question turns are cheap and never wait behind it.
+FINAL_STEP_CONCURRENCY = 4
+FINAL_STEP_QUEUE_SIZE = 16
+FINAL_STEP_QUEUE_DEADLINE = 20  # seconds
+
+final_step_admission = AdmissionController(
+    max_concurrent=FINAL_STEP_CONCURRENCY,
+    max_queue=FINAL_STEP_QUEUE_SIZE,
+    queue_deadline=FINAL_STEP_QUEUE_DEADLINE
+)
+
+# Upstream budgets (OpenAI tokens, Maps requests and elements); a limit of 0 disables it.
+# Running low on either budget degrades the response; an exhausted hourly budget rejects it.
+CONVERSATION_LIMITS = {
+    "tokens": int(os.getenv("CONVERSATION_TOKEN_LIMIT", 8000)),
+    "maps_elements": int(os.getenv("CONVERSATION_MAPS_ELEMENT_LIMIT", 60))
+}
+HOURLY_LIMITS = {
+    "tokens": int(os.getenv("HOURLY_TOKEN_LIMIT", 500000)),
+    "maps_requests": int(os.getenv("HOURLY_MAPS_REQUEST_LIMIT", 5000)),
+    "maps_elements": int(os.getenv("HOURLY_MAPS_ELEMENT_LIMIT", 10000))
+}
+
+cost_ledger = CostLedger(CONVERSATION_LIMITS, HOURLY_LIMITS, window_seconds=3600)
+
+# Fewer venues (and so fewer Maps calls) as the budget runs out
+VENUE_COUNT_BY_LEVEL = {FULL: RECOMMENDED_VENUE_COUNT, REDUCED: 6, MINIMAL: 3}
+
+# Every venue we have seen (LLM results, place_data.json, saved venues), deduplicated and indexed.
+# Recommendations come from here first; the LLM only fills the gaps.
+venue_catalog = VenueCatalog(
+    'venue_catalog.json',
+    seed_files=[('place_data.json', 'places'), ('saved_places.json', 'venues')]
+)
+
 class ConversationState:
     def __init__(self):
         self.current_question = 0
@@ -48,6 +143,15 @@ class ConversationState:
             "budget",
             "attendees"
         ]
+        self.prefetch_task: Optional[asyncio.Task] = None
+        self.completing = False  # the final answer is being turned into recommendations
+        self.last_active = datetime.now()
+
+    def cancel_prefetch(self):
+        # The worker thread finishes on its own, but its result is discarded
+        if self.prefetch_task is not None and not self.prefetch_task.done():
+            self.prefetch_task.cancel()
+        self.prefetch_task = None
 
 class MessageRequest(BaseModel):
     message: str
@@ -84,10 +188,134 @@ class SaveVenueRequest(BaseModel):
     date: str
     event_type: str
 
+class BatchVenue(BaseModel):
+    name: str
+    address: str
+
+class BatchEnrichRequest(BaseModel):
+    venues: List[BatchVenue]
+    dates: List[str]
+    include: List[str] = ["traffic", "accessibility", "weather", "safety"]
+
 # Store conversation states
 conversations: Dict[str, ConversationState] = {}
 
-def generate_venue_recommendations(data: dict) -> List[dict]:
+def sweep_idle_conversations():
+    """Drop abandoned conversations and cancel their background work"""
+    cutoff = datetime.now() - CONVERSATION_TTL
+    for conversation_id, state in list(conversations.items()):
+        if state.last_active < cutoff:
+            state.cancel_prefetch()
+            cost_ledger.release(conversation_id)
+            del conversations[conversation_id]
+
+def stream_venues(prompt: str) -> Iterator[dict]:
+    """Stream the LLM completion and yield each element of its 'venues' array as soon as it closes"""
+    stream = get_openai_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are an expert event planner with extensive knowledge of real venues. Always provide accurate, currently operating venues with real details."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={ "type": "json_object" },
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+
+    parser = JsonArrayStreamParser("venues")
+    received = False
+    for chunk in stream:
+        # Token usage arrives on the last chunk
+        if chunk.usage:
+            cost_ledger.record("tokens", chunk.usage.total_tokens)
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        received = True
+        yield from parser.feed(chunk.choices[0].delta.content)
+
+    if not received:
+        raise Exception("No response received from OpenAI")
+
+def request_venues(prompt: str) -> List[dict]:
+    """Ask the LLM for a JSON object with a 'venues' array and return the array"""
+    return list(stream_venues(prompt))
+
+def generate_candidate_venues(event_type: str, location: str) -> List[dict]:
+    """Speculative venue list built from event type and location only"""
+    event_type = event_type.split()[0].lower()
+
+    prompt = f"""As an expert event planner, recommend {SPECULATIVE_VENUE_COUNT} real and currently operating venues in {location} that would be perfect for a {event_type}.
+    Cover a wide range of capacities and price points.
+
+    Research and provide real venues that actually exist, including:
+    - The venue's real name and actual location
+    - Their real street address
+    - Actual capacity information
+    - Real amenities and features they offer
+    - Their genuine website or social media presence
+
+    Format the response as a JSON object with a 'venues' array containing the recommendations.
+    Example format:
+    {{
+        "venues": [
+            {{
+                "name": "Real Venue Name",
+                "address": "Actual Street Address",
+                "capacity": "Specific capacity range",
+                "features": ["Real Feature 1", "Real Feature 2", "Real Feature 3"],
+                "source": "Actual website URL",
+                "state": "Actual state",
+                "estimated_cost": "Typical rental price, e.g. Starting from $2,000 per day",
+            }}
+        ]
+    }}"""
+
+    try:
+        return request_venues(prompt)
+    except Exception as e:
+        print(f"Error generating candidate venues: {str(e)}")
+        return []
+
+def with_request_fields(venue: dict, data: dict) -> dict:
+    """Copy of a catalog venue carrying the details of this request"""
+    venue = dict(venue)
+    # Venues seeded from place_data.json only have a website; the chat link and save use source
+    venue.setdefault("source", venue.get("website", ""))
+    venue.update({
+        "time": data['time'],
+        "date": data['date'],
+        "event_type": data['event_type'].split()[0].lower(),
+        "budget": data['budget'],
+        "attendees": data['attendees'],
+    })
+    return venue
+
+def absorb_generated(venues: Iterable[dict], event_type: str, skip_errors: bool = False) -> Iterator[dict]:
+    """Pass generated venues through, adding each one to the catalog"""
+    for venue in venues:
+        if skip_errors and venue.get('name') == 'Error':
+            continue
+        venue_catalog.absorb([venue], event_type, save=False)
+        yield venue
+    venue_catalog.save()
+
+async def prefetch_venues(data: dict) -> List[dict]:
+    """Generate candidate venues and warm the city-level Maps lookups in the background.
+
+    Candidates cover every price point; the catalog search narrows them to the budget and
+    party size once those answers arrive.
+    """
+    candidates, _ = await asyncio.gather(
+        asyncio.to_thread(generate_candidate_venues, data['event_type'], data['location']),
+        # Enrichment looks up the city part of each venue address ("Boston"), not the raw answer ("boston, ma")
+        asyncio.to_thread(get_transport_locations, data['location'].split(',')[0], True),
+        return_exceptions=True
+    )
+    if isinstance(candidates, Exception):
+        raise candidates
+    return candidates
+
+def generate_venue_recommendations(data: dict, count: int = RECOMMENDED_VENUE_COUNT, exclude: List[str] = ()) -> Iterator[dict]:
     # Format the date to ensure YYYY-MM-DD format
     try:
         date_obj = datetime.strptime(data['date'], '%Y-%m-%d')
@@ -98,7 +326,10 @@ def generate_venue_recommendations(data: dict) -> List[dict]:
     # Ensure event_type is single word
     event_type = data['event_type'].split()[0].lower()
     
-    prompt = f"""As an expert event planner, recommend 9 real and currently operating venues in {data['location']} that would be perfect for a {event_type} with {data['attendees']} attendees and a budget of {data['budget']}.
+    # Venues we already have locally shouldn't be generated again
+    exclusion = f"\n    Do not include any of these venues: {', '.join(exclude)}.\n" if exclude else ""
+    
+    prompt = f"""As an expert event planner, recommend {count} real and currently operating venues in {data['location']} that would be perfect for a {event_type} with {data['attendees']} attendees and a budget of {data['budget']}.{exclusion}
 
     Research and provide real venues that actually exist, including:
     - The venue's real name and actual location
@@ -118,6 +349,7 @@ def generate_venue_recommendations(data: dict) -> List[dict]:
                 "features": ["Real Feature 1", "Real Feature 2", "Real Feature 3"],
                 "source": "Actual website URL",
                 "state": "Actual state",
+                "estimated_cost": "Typical rental price, e.g. Starting from $2,000 per day",
                 "time": "{data['time']}",
                 "date": "{formatted_date}",
                 "event_type": "{event_type}",
@@ -127,31 +359,20 @@ def generate_venue_recommendations(data: dict) -> List[dict]:
         ]
     }}"""
 
+    generated = 0
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert event planner with extensive knowledge of real venues. Always provide accurate, currently operating venues with real details."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={ "type": "json_object" }
-        )
-        
-        if not response.choices or not response.choices[0].message.content:
-            raise Exception("No response received from OpenAI")
-            
-        venues_data = json.loads(response.choices[0].message.content)
-        venues = venues_data.get('venues', [])
-        
-        # Add date and event_type to each venue
-        for venue in venues:
+        # Yield venues while the model is still writing the rest of the list
+        for venue in stream_venues(prompt):
+            # Add date and event_type to each venue
             venue['date'] = formatted_date
             venue['event_type'] = event_type
-            
-        return venues
+            generated += 1
+            yield venue
     except Exception as e:
         print(f"Error generating venues: {str(e)}")
-        return [{
+        if generated:
+            return
+        yield {
             "name": "Error",
             "address": "Could not generate venue recommendations at this time",
             "capacity": "Unknown",
@@ -159,7 +380,43 @@ def generate_venue_recommendations(data: dict) -> List[dict]:
             "source": "",
             "date": formatted_date,
             "event_type": event_type
-        }]
+        }
+
+def venue_destination(venue: dict) -> tuple[str, str]:
+    """City and Maps destination string for a venue"""
+    city = venue['address'].split(',')[1].strip()
+    return city, venue['name'] + ', ' + city
+
+def enrich_venue(venue: dict, date: str, service_level: str = FULL) -> dict:
+    """Attach traffic, accessibility, weather and safety data to a venue"""
+    try:
+        city, destination = venue_destination(venue)
+        
+        # Get only essential traffic data with fewer time points, and fewer still as the budget runs out
+        venue['traffic'] = get_simplified_traffic_data(city, destination, date, service_level)
+        
+        # Add other data directly without additional API calls
+        venue['accessibility_score'] = random.randint(70, 95)
+        venue['weather_data'] = predictWeather()
+        venue['safety_data'] = safetyReport()
+        
+    except Exception as e:
+        print(f"Error processing data for venue {venue.get('name')}: {str(e)}")
+        venue['traffic'] = None
+        venue['accessibility_score'] = random.randint(70, 95)
+        venue['weather_data'] = None
+        venue['safety_data'] = None
+    return venue
+
+def enrich_venues(venues: Iterable[dict], date: str, service_level: str = FULL) -> List[dict]:
+    """Enrich venues in a thread pool, starting each one as soon as the iterable yields it.
+
+    The service level is fixed by the caller so every venue in one response gets the same data.
+    """
+    with ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS) as pool:
+        # Each task gets its own copy of the context so Maps calls are billed to the conversation
+        futures = [pool.submit(contextvars.copy_context().run, enrich_venue, venue, date, service_level) for venue in venues]
+        return [future.result() for future in futures]
 
 def validate_input(question_type: str, user_input: str) -> tuple[bool, str]:
     """Validate user input and return (is_valid, processed_input)"""
@@ -320,13 +577,56 @@ def convert_to_24hr(hour: int, minute: int, period: str = None) -> str:
         
     return f"{hour:02d}:{minute:02d}"
 
+async def complete_conversation(state: ConversationState) -> List[dict]:
+    """Generate and enrich the venue recommendations once every question is answered"""
+    # A conversation that spent its own budget still gets the cheapest response
+    service_level = cost_ledger.service_level()
+    count = VENUE_COUNT_BY_LEVEL.get(service_level, VENUE_COUNT_BY_LEVEL[MINIMAL])
+    
+    data = state.collected_data
+    if state.prefetch_task is not None:
+        try:
+            # Speculative candidates go into the catalog, which narrows them to this request below
+            candidates = await state.prefetch_task
+            await asyncio.to_thread(venue_catalog.absorb, candidates, data['event_type'])
+        except Exception as e:
+            print(f"Error using prefetched venues: {str(e)}")
+    
+    # Only venues that fit the party size and the budget are served from the catalog
+    attendees = int(data['attendees'])
+    matches = await asyncio.to_thread(
+        venue_catalog.search,
+        city=data['location'],
+        event_type=data['event_type'],
+        min_capacity=attendees,
+        max_capacity=attendees * MAX_CAPACITY_FACTOR,
+        max_cost=int(data['budget']),
+        limit=count
+    )
+    venues = [with_request_fields(venue, data) for venue in matches]
+    
+    # Ask the LLM only for the venues the catalog couldn't supply.
+    # Streamed venues are enriched while the model is still generating the rest.
+    missing = count - len(venues)
+    if missing > 0:
+        generated = generate_venue_recommendations(data, missing, exclude=[venue['name'] for venue in venues])
+        venues = itertools.chain(venues, absorb_generated(generated, data['event_type'], skip_errors=bool(venues)))
+    
+    return await asyncio.to_thread(enrich_venues, venues, data['date'], service_level)
+
 @app.post("/api/ai_message", response_model=MessageResponse)
-async def handle_message(request: MessageRequest):
+async def handle_message(request: MessageRequest, http_request: Request, fields: Optional[str] = None):
     try:
         conversation_id = request.conversation_id or "default_user"
+        current_conversation.set(conversation_id)
+        sweep_idle_conversations()
         
         if request.message.lower() == "start":
+            if conversation_id in conversations:
+                conversations[conversation_id].cancel_prefetch()
+            cost_ledger.release(conversation_id)
             conversations[conversation_id] = ConversationState()
+            cost_ledger.track(conversation_id)
             return MessageResponse(
                 message="What type of event are you planning?",
                 type="question",
@@ -335,6 +635,7 @@ async def handle_message(request: MessageRequest):
         
         if conversation_id not in conversations:
             conversations[conversation_id] = ConversationState()
+            cost_ledger.track(conversation_id)
             return MessageResponse(
                 message="Please type 'start' to begin planning your event.",
                 type="question",
@@ -342,6 +643,15 @@ async def handle_message(request: MessageRequest):
             )
         
         state = conversations[conversation_id]
+        state.last_active = datetime.now()
+        
+        # A resent final answer while the first one is still being processed
+        if state.completing:
+            return MessageResponse(
+                message="I'm still finding venues for your event. They'll appear here shortly.",
+                type="error",
+                timestamp=datetime.now()
+            )
         
         if state.current_question < len(state.questions):
             current_q = state.questions[state.current_question]
@@ -367,6 +677,12 @@ async def handle_message(request: MessageRequest):
             state.collected_data[current_q] = processed_input
             state.current_question += 1
             
+            # Start venue generation as soon as event type and location are known,
+            # unless the budget is too tight to spend tokens on a speculative list
+            if current_q == "location" and cost_ledger.service_level() == FULL:
+                state.cancel_prefetch()
+                state.prefetch_task = asyncio.create_task(prefetch_venues(dict(state.collected_data)))
+            
             if state.current_question < len(state.questions):
                 next_q = state.questions[state.current_question]
                 return MessageResponse(
@@ -375,29 +691,26 @@ async def handle_message(request: MessageRequest):
                     timestamp=datetime.now()
                 )
             else:
-                venues = generate_venue_recommendations(state.collected_data)
-                
-                # Process venues in parallel using list comprehension
-                # Simplified traffic data collection
-                for venue in venues:
-                    try:
-                        city = venue['address'].split(',')[1].strip()
-                        destination = venue['name'] + ', ' + city
-                        
-                        # Get only essential traffic data with fewer time points
-                        venue['traffic'] = get_simplified_traffic_data(city, destination, state.collected_data['date'])
-                        
-                        # Add other data directly without additional API calls
-                        venue['accessibility_score'] = random.randint(70, 95)
-                        venue['weather_data'] = predictWeather()
-                        venue['safety_data'] = safetyReport()
-                        
-                    except Exception as e:
-                        print(f"Error processing data for venue {venue.get('name')}: {str(e)}")
-                        venue['traffic'] = None
-                        venue['accessibility_score'] = random.randint(70, 95)
-                        venue['weather_data'] = None
-                        venue['safety_data'] = None
+                # Duplicate submits of the last answer are turned away until this one finishes
+                state.completing = True
+                venues = None
+                try:
+                    # Checked before admission so instant rejections don't skew its duration estimate
+                    if cost_ledger.window_exhausted():
+                        raise QuotaExceeded(cost_ledger.seconds_until_reset())
+                    async with final_step_admission.admit():
+                        venues = await complete_conversation(state)
+                except (AdmissionRejected, QuotaExceeded) as e:
+                    raise HTTPException(
+                        status_code=429,
+                        detail="We're handling a lot of requests right now. Please try again shortly.",
+                        headers={"Retry-After": str(e.retry_after)}
+                    )
+                finally:
+                    state.completing = False
+                    # On any failure keep the conversation on the last question so the client can resend it
+                    if venues is None:
+                        state.current_question -= 1
                 
                 try:
                     with open('event_data.json', 'a') as f:
@@ -408,21 +721,46 @@ async def handle_message(request: MessageRequest):
                 
                 del conversations[conversation_id]
                 
+                print(f"Upstream usage for conversation {conversation_id}: {cost_ledger.release(conversation_id)}")
                 print(venues)
                 
-                return MessageResponse(
-                    message="Great! I've found some venues that match your criteria.",
-                    type="venues",
-                    venues=venues,
-                    timestamp=datetime.now()
-                )
+                # Venue lists are large, so skip Pydantic validation and serialize them with orjson
+                return json_response(http_request, {
+                    "message": "Great! I've found some venues that match your criteria.",
+                    "type": "venues",
+                    "venues": project_fields(venues, fields),
+                    "timestamp": datetime.now()
+                }, etag=False)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def count_maps_call(elements: int = 0):
+    # Only Distance Matrix calls are billed per element; geocode and places are plain requests
+    cost_ledger.record("maps_requests", 1)
+    if elements:
+        cost_ledger.record("maps_elements", elements)
+
+def maps_distance_matrix(origins, destinations, **kwargs):
+    """gmaps.distance_matrix, billed as one request with origins x destinations elements"""
+    size = lambda locations: 1 if isinstance(locations, str) else len(locations)
+    count_maps_call(size(origins) * size(destinations))
+    return get_gmaps().distance_matrix(origins=origins, destinations=destinations, **kwargs)
+
+# City-level lookups shared across venues and conversations
+transport_cache = TTLCache(maxsize=2000, ttl=24 * 3600)
+
 def get_transport_locations(city_name, airport=False):
-    geocode_result = gmaps.geocode(city_name)
+    cache_key = (city_name.strip().lower(), airport)
+    cached = transport_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    count_maps_call()
+    geocode_result = get_gmaps().geocode(city_name)
     
     if not geocode_result:
         return f"City '{city_name}' not found."
@@ -434,19 +772,29 @@ def get_transport_locations(city_name, airport=False):
     transport_locations = []
 
     for transport_type in transport_types:
-        places_result = gmaps.places_nearby((lat, lng), radius=5000, type=transport_type)
+        count_maps_call()
+        places_result = get_gmaps().places_nearby((lat, lng), radius=5000, type=transport_type)
         
         for place in places_result.get('results', []):
             transport_locations.append(place['name'] + ', ' + city_name)
     
+    transport_cache[cache_key] = transport_locations
     return transport_locations
 
 @app.get("/traffic")
 def get_traffic_data(city_name: str, destination: str, future_date: str):
+    if cost_ledger.window_exhausted():
+        raise HTTPException(
+            status_code=429,
+            detail="Upstream budget exhausted. Please try again later.",
+            headers={"Retry-After": str(cost_ledger.seconds_until_reset())}
+        )
     start_time = datetime.strptime(future_date, "%Y-%m-%d")
     data_collection = {}
     airport_locations = get_transport_locations(city_name,True)[:1]
-    transport_locations=get_transport_locations(city_name)[:5]
+    # Average commute times are skipped when the hourly budget runs low
+    include_average_times = cost_ledger.service_level() == FULL
+    transport_locations=get_transport_locations(city_name)[:5] if include_average_times else []
 
     
     # Loop from 9 AM to midnight
@@ -454,7 +802,7 @@ def get_traffic_data(city_name: str, destination: str, future_date: str):
         current_time = start_time + timedelta(hours=hour)
         unix_timestamp = int(time.mktime(current_time.timetuple()))
         
-        traffic_results = gmaps.distance_matrix(
+        traffic_results = maps_distance_matrix(
             origins=airport_locations,
             destinations=destination,
             departure_time=unix_timestamp,
@@ -477,7 +825,7 @@ def get_traffic_data(city_name: str, destination: str, future_date: str):
     # Calculate average commute times for all 5 locations
     average_times = {}
     for origin in transport_locations:
-        traffic_results = gmaps.distance_matrix(
+        traffic_results = maps_distance_matrix(
             origins=[origin],
             destinations=[destination],
             departure_time=start_time.timestamp(),
@@ -587,50 +935,208 @@ def get_random_features():
     features = generate_random_features()
     return features
 
-def get_simplified_traffic_data(city_name: str, destination: str, future_date: str):
+# Travel times already fetched, keyed by (origin, destination, date, hour)
+traffic_cache = TTLCache(maxsize=50000, ttl=6 * 3600)
+
+# Key hours actually queried at each service level; the others are interpolated or served from cache
+TRAFFIC_HOURS_BY_LEVEL = {FULL: [9, 14, 18], REDUCED: [9, 18], MINIMAL: [], EXHAUSTED: []}
+
+def interpolate_travel_times(times: Dict[int, dict], key_hours: List[int]):
+    """Fill missing key hours linearly from the nearest known hours on either side"""
+    known = [hour for hour in key_hours if hour in times and times[hour]["travel_time_seconds"] is not None]
+    for hour in key_hours:
+        if hour in times:
+            continue
+        before = [h for h in known if h < hour]
+        after = [h for h in known if h > hour]
+        if not before or not after:
+            continue
+        h0, h1 = before[-1], after[0]
+        s0, s1 = times[h0]["travel_time_seconds"], times[h1]["travel_time_seconds"]
+        seconds = int(round(s0 + (s1 - s0) * (hour - h0) / (h1 - h0)))
+        times[hour] = {
+            "travel_time_text": f"{round(seconds / 60)} mins",
+            "travel_time_seconds": seconds,
+            "interpolated": True
+        }
+
+def get_simplified_traffic_data(city_name: str, destination: str, future_date: str, service_level: str = FULL):
     """Simplified version of traffic data collection with fewer time points"""
     start_time = datetime.strptime(future_date, "%Y-%m-%d")
     data_collection = {}
     
     # Only get one main transport location instead of multiple
     airport_location = get_transport_locations(city_name, True)[:1]
+    if not airport_location:
+        return {"traffic_data": data_collection}
+    origin = airport_location[0]
     
     # Only check traffic for key hours (morning, afternoon, evening)
     key_hours = [9, 14, 18]  # Reduced from checking every hour
+    queried_hours = TRAFFIC_HOURS_BY_LEVEL.get(service_level, [])
+    times = {}
     
     for hour in key_hours:
+        cache_key = (origin.lower(), destination.lower(), future_date, hour)
+        cached = traffic_cache.get(cache_key)
+        if cached is not None:
+            times[hour] = cached
+            continue
+        if hour not in queried_hours:
+            continue
+        
+        current_time = start_time + timedelta(hours=hour)
+        unix_timestamp = int(time.mktime(current_time.timetuple()))
+        
+        traffic_results = maps_distance_matrix(
+            origins=airport_location,
+            destinations=[destination],
+            departure_time=unix_timestamp,
+            traffic_model="best_guess",
+            mode="driving"
+        )
+        
+        duration_text = traffic_results["rows"][0]["elements"][0].get("duration_in_traffic", {}).get("text", "N/A")
+        duration_value = traffic_results["rows"][0]["elements"][0].get("duration_in_traffic", {}).get("value", None)
+        
+        times[hour] = {
+            "travel_time_text": duration_text,
+            "travel_time_seconds": duration_value
+        }
+        traffic_cache[cache_key] = times[hour]
+    
+    interpolate_travel_times(times, key_hours)
+    
+    if times:
+        data_collection[origin] = {"times": {
+            (start_time + timedelta(hours=hour)).strftime("%H:%M"): times[hour]
+            for hour in key_hours if hour in times
+        }}
+    
+    return {"traffic_data": data_collection}
+
+# Distance Matrix accepts at most 25 destinations per request
+MAX_MATRIX_DESTINATIONS = 25
+MAX_BATCH_CELLS = 1000
+
+def prefetch_traffic_matrix(origin: str, destinations: List[str], future_date: str, hours: List[int]):
+    """Fill traffic_cache with one distance matrix per hour for every destination sharing an origin"""
+    start_time = datetime.strptime(future_date, "%Y-%m-%d")
+    for hour in hours:
+        pending = [d for d in destinations if (origin.lower(), d.lower(), future_date, hour) not in traffic_cache]
         current_time = start_time + timedelta(hours=hour)
         unix_timestamp = int(time.mktime(current_time.timetuple()))
         
-        if airport_location:
-            traffic_results = gmaps.distance_matrix(
-                origins=airport_location,
-                destinations=[destination],
+        for i in range(0, len(pending), MAX_MATRIX_DESTINATIONS):
+            chunk = pending[i:i + MAX_MATRIX_DESTINATIONS]
+            traffic_results = maps_distance_matrix(
+                origins=[origin],
+                destinations=chunk,
                 departure_time=unix_timestamp,
                 traffic_model="best_guess",
                 mode="driving"
             )
+            for j, destination in enumerate(chunk):
+                element = traffic_results["rows"][0]["elements"][j]
+                traffic_cache[(origin.lower(), destination.lower(), future_date, hour)] = {
+                    "travel_time_text": element.get("duration_in_traffic", {}).get("text", "N/A"),
+                    "travel_time_seconds": element.get("duration_in_traffic", {}).get("value", None)
+                }
+
+def airport_for_city(city: str) -> Optional[str]:
+    locations = get_transport_locations(city, True)
+    # get_transport_locations returns a message string when the city can't be geocoded
+    if isinstance(locations, str) or not locations:
+        return None
+    return locations[0]
+
+@app.post("/api/enrich/batch")
+async def enrich_batch(request: BatchEnrichRequest):
+    """Enrich a venues x dates grid and stream one NDJSON line per cell.
+
+    Shared sub-work is done once per unique key: airport lookups per city, one distance matrix
+    per (origin, date, hour) covering every venue, accessibility per venue and weather per
+    (city, date). Cells are then assembled from those results.
+    """
+    for date in request.dates:
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date '{date}', expected YYYY-MM-DD")
+    if len(request.venues) * len(request.dates) > MAX_BATCH_CELLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CELLS} venue/date cells per batch")
+    if "traffic" in request.include and cost_ledger.window_exhausted():
+        retry_after = cost_ledger.seconds_until_reset()
+        raise HTTPException(
+            status_code=429,
+            detail="Upstream budget exhausted. Please try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
+    venues = [venue.dict() for venue in request.venues]
+    
+    async def stream_cells():
+        destinations = {}
+        for index, venue in enumerate(venues):
+            try:
+                destinations[index] = venue_destination(venue)
+            except IndexError:
+                destinations[index] = None
+        
+        cities = sorted({city for city, _ in filter(None, destinations.values())}, key=str.lower)
+        airports = {}
+        if "traffic" in request.include:
+            found = await asyncio.gather(*[asyncio.to_thread(airport_for_city, city) for city in cities], return_exceptions=True)
+            airports = {city: origin for city, origin in zip(cities, found) if isinstance(origin, str)}
+        
+        accessibility = {index: random.randint(70, 95) for index in range(len(venues))}
+        weather = {}
+        # Same traffic hours for every date in the batch, even if the budget crosses a threshold midway
+        hours = TRAFFIC_HOURS_BY_LEVEL.get(cost_ledger.service_level(), [])
+        
+        for date in request.dates:
+            if "traffic" in request.include:
+                by_origin = {}
+                for location in filter(None, destinations.values()):
+                    if location[0] in airports:
+                        by_origin.setdefault(airports[location[0]], set()).add(location[1])
+                results = await asyncio.gather(*[
+                    asyncio.to_thread(prefetch_traffic_matrix, origin, sorted(targets), date, hours)
+                    for origin, targets in by_origin.items()
+                ], return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        print(f"Error fetching traffic matrix: {str(result)}")
             
-            origin = airport_location[0]
-            duration_text = traffic_results["rows"][0]["elements"][0].get("duration_in_traffic", {}).get("text", "N/A")
-            duration_value = traffic_results["rows"][0]["elements"][0].get("duration_in_traffic", {}).get("value", None)
-            
-            if origin not in data_collection:
-                data_collection[origin] = {"times": {}}
-            
-            data_collection[origin]["times"][current_time.strftime("%H:%M")] = {
-                "travel_time_text": duration_text,
-                "travel_time_seconds": duration_value
-            }
+            for index, venue in enumerate(venues):
+                cell = {"name": venue['name'], "address": venue['address'], "date": date}
+                location = destinations[index]
+                try:
+                    if "traffic" in request.include:
+                        # Served from traffic_cache (and interpolation); no further Maps calls
+                        has_airport = location is not None and location[0] in airports
+                        cell['traffic'] = get_simplified_traffic_data(location[0], location[1], date, MINIMAL) if has_airport else None
+                    if "accessibility" in request.include:
+                        cell['accessibility_score'] = accessibility[index]
+                    if "weather" in request.include:
+                        city_key = (location[0].lower() if location else venue['address'].lower(), date)
+                        if city_key not in weather:
+                            weather[city_key] = predictWeather()
+                        cell['weather_data'] = weather[city_key]
+                    if "safety" in request.include:
+                        cell['safety_data'] = safetyReport()
+                except Exception as e:
+                    print(f"Error enriching {venue['name']} on {date}: {str(e)}")
+                    cell['error'] = str(e)
+                yield json.dumps(cell) + "\n"
     
-    return {"traffic_data": data_collection}
+    return StreamingResponse(stream_cells(), media_type="application/x-ndjson")
 
 @app.get("/generate-random-places", response_model=PlaceResponse)
-async def generate_random_places(event_type: str = "party"):
+async def generate_random_places(request: Request, event_type: str = "party", fields: Optional[str] = None):
     try:
-        # Read the JSON file
-        with open('place_data.json', 'r') as file:
-            all_places = json.load(file)
+        # Read the JSON file (parsed once and reused until it changes)
+        all_places = read_json_cached('place_data.json')
         
         # Filter places that match the event type (case-insensitive)
         matching_places = [
@@ -648,7 +1154,11 @@ async def generate_random_places(event_type: str = "party"):
             min(20, len(matching_places))  # Ensure we don't try to sample more than available
         )
         
-        return PlaceResponse(places=selected_places)
+        return json_response(
+            request,
+            {"places": project_fields(selected_places, fields), "timestamp": datetime.now()},
+            etag=False  # A new random sample every call, so there is nothing to revalidate
+        )
         
     except Exception as e:
         print(f"Error generating places: {str(e)}")
@@ -681,27 +1191,60 @@ async def save_venue(venue: SaveVenueRequest):
         # Write back to file
         with open('saved_places.json', 'w') as f:
             json.dump(data, f, indent=2)
-
-        return {"message": "Venue saved successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save venue: {str(e)}")
 
+    # The user's save is done; the catalog is a cache, so its errors are only logged
+    try:
+        await asyncio.to_thread(venue_catalog.absorb, [venue.dict()])
+    except Exception as e:
+        print(f"Error adding saved venue to the catalog: {str(e)}")
+
+    return {"message": "Venue saved successfully"}
+
 @app.get("/api/saved-venues")
-async def get_saved_venues():
+async def get_saved_venues(request: Request, fields: Optional[str] = None):
     try:
         # Check if the file exists
         saved_places_file = Path('saved_places.json')
         if not saved_places_file.exists():
-            return {"venues": []}
+            return json_response(request, {"venues": []})
 
-        # Read and return the saved venues
-        with open('saved_places.json', 'r') as f:
-            data = json.load(f)
-            
-        return data
+        # Read and return the saved venues; unchanged collections are answered with 304
+        data = read_json_cached('saved_places.json')
+        return json_response(request, {**data, "venues": project_fields(data.get('venues', []), fields)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve saved venues: {str(e)}")
 
+@app.get("/api/venues/search")
+async def search_venues(
+    request: Request,
+    q: Optional[str] = None,
+    city: Optional[str] = None,
+    event_type: Optional[str] = None,
+    min_capacity: Optional[int] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: float = 5.0,
+    limit: int = 20,
+    fields: Optional[str] = None
+):
+    try:
+        near = (lat, lng) if lat is not None and lng is not None else None
+        venues = await asyncio.to_thread(
+            venue_catalog.search,
+            city=city,
+            event_type=event_type,
+            min_capacity=min_capacity,
+            text=q,
+            near=near,
+            radius_km=radius_km,
+            limit=limit
+        )
+        return json_response(request, {"venues": project_fields(venues, fields)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search venues: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
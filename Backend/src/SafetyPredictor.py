@@ -1,7 +1,7 @@
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.tools import Tool
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationSummaryBufferMemory
 from langchain.agents import initialize_agent, AgentType
 import datetime
 import joblib
@@ -10,6 +10,12 @@ import numpy as np
 import cv2
 from ultralytics import YOLO
 import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from crime_grid import CrimeRiskGrid
+from compiled_model import CompiledModel
 
 # Set up OpenAI API key
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")  # Replace with actual API key
@@ -17,13 +23,51 @@ os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")  # Replace with actua
 # Initialize LLM
 llm = ChatOpenAI(model_name="gpt-4", temperature=0.5)
 
-# Define memory for conversation history
-memory = ConversationBufferMemory(memory_key="chat_history")
+# Cheaper model used only to compact old conversation turns into the rolling summary
+summary_llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0)
+
+# Per-session conversation memory. Turns beyond the token budget are folded into a rolling summary,
+# and sessions idle for longer than SESSION_TTL (or beyond MAX_SESSIONS) are evicted, oldest first.
+MEMORY_TOKEN_LIMIT = 1000
+SESSION_TTL = 30 * 60  # seconds
+MAX_SESSIONS = 500
+session_memories = OrderedDict()  # session_id -> (memory, last_used)
+session_memories_lock = threading.Lock()
+
+def get_session_memory(session_id):
+    now = time.monotonic()
+    with session_memories_lock:
+        entry = session_memories.pop(session_id, None)
+
+        while session_memories:
+            oldest_id, (_, last_used) = next(iter(session_memories.items()))
+            if now - last_used <= SESSION_TTL and len(session_memories) < MAX_SESSIONS:
+                break
+            del session_memories[oldest_id]
+
+        if entry is None:
+            memory = ConversationSummaryBufferMemory(
+                llm=summary_llm,
+                max_token_limit=MEMORY_TOKEN_LIMIT,
+                memory_key="chat_history"
+            )
+        else:
+            memory = entry[0]
+        session_memories[session_id] = (memory, now)
+        return memory
 
 # Load the trained model
 MODEL_FILENAME = "C:\SchedulEase\Backend\src\model.pkl"
 crime_model = joblib.load(MODEL_FILENAME)
 
+# Precomputed crime grid (built with crime_grid.py), used instead of the model when available
+CRIME_GRID_FILENAME = os.getenv("CRIME_GRID_PATH", os.path.join(os.path.dirname(__file__), "crime_grid.npy"))
+crime_grid = CrimeRiskGrid(CRIME_GRID_FILENAME) if os.path.exists(CRIME_GRID_FILENAME) else None
+
+# Array-based export of crime_model (built with compiled_model.py), skips pandas and sklearn dispatch
+COMPILED_MODEL_FILENAME = os.getenv("CRIME_MODEL_COMPILED_PATH", os.path.join(os.path.dirname(__file__), "crime_model_compiled.npz"))
+compiled_crime_model = CompiledModel(COMPILED_MODEL_FILENAME) if os.path.exists(COMPILED_MODEL_FILENAME) else None
+
 # Mapping for day of the week
 days_mapping = {
     'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 'Thursday': 3,
@@ -45,6 +89,13 @@ def predict_crime(lat, long, hour, month, day_of_week):
     if isinstance(day_of_week, str):
         day_of_week = days_mapping[day_of_week.strip()]
 
+    # Grid lookup is a single array index; fall back to the model outside the grid region
+    if crime_grid is not None and crime_grid.contains(lat, long):
+        return crime_grid.lookup(lat, long, hour, month, day_of_week)
+
+    if compiled_crime_model is not None:
+        return compiled_crime_model.predict_raw(lat, long, hour, month, day_of_week)[0]
+
     input_df = pd.DataFrame([{
         'Lat': lat,
         'Long': long,
@@ -59,25 +110,49 @@ def predict_crime(lat, long, hour, month, day_of_week):
 # Load YOLO model for CCTV analysis
 cctv_model = YOLO("yolov8n.pt")
 
-# Function to analyze CCTV footage
-def detect_suspicious_activity():
-    cap = cv2.VideoCapture(0)  # Replace with actual CCTV stream
+# The YOLO model is shared by every caller, so inference runs one frame at a time
+cctv_model_lock = threading.Lock()
+
+# Grab a single frame from a CCTV stream (camera index or stream URL)
+def read_frame(source=0):
+    cap = cv2.VideoCapture(source)
     ret, frame = cap.read()
+    cap.release()
+    return frame if ret else None
 
-    if not ret:
-        return "No video feed available"
+# Coarse signature of a frame, so near-identical frames can be skipped
+def frame_signature(frame):
+    if frame is None:
+        return None
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (16, 16), interpolation=cv2.INTER_AREA)
+    return (small >> 4).tobytes()
 
-    results = cctv_model(frame)
-    detected_objects = [cctv_model.names[int(box.cls[0])] for r in results for box in r.boxes]
+def detect_objects(frame):
+    with cctv_model_lock:
+        results = cctv_model(frame)
+    return [cctv_model.names[int(box.cls[0])] for r in results for box in r.boxes]
 
-    cap.release()
-    return detected_objects
+# Function to analyze CCTV footage
+def detect_suspicious_activity(source=0):
+    frame = read_frame(source)  # Replace with actual CCTV stream
 
-# Function to fetch AI-generated suspicious objects
+    if frame is None:
+        return "No video feed available"
+
+    return detect_objects(frame)
+
+# Function to fetch AI-generated suspicious objects (the list doesn't change, so ask once)
+@lru_cache(maxsize=1)
 def get_suspicious_objects():
     prompt = "List the objects or items that are considered suspicious or dangerous in a security surveillance setting."
     return llm.predict(prompt).lower().split(", ")
 
+# The same tweet is often seen by several checks, so analyze it once
+@lru_cache(maxsize=4096)
+def analyze_tweet(tweet):
+    return llm.predict(f"Analyze the following tweet for security risks: {tweet}")
+
 # Function to analyze social media alerts
 def analyze_social_media(tweetts: str = None):
     if not tweetts:
@@ -85,7 +160,7 @@ def analyze_social_media(tweetts: str = None):
     threats = []
     print(tweetts, "tweets")
     for tweet in tweetts:
-        response = llm.predict(f"Analyze the following tweet for security risks: {tweet}")
+        response = analyze_tweet(tweet)
 
         if "threat" in response.lower():
             threats.append(response)
@@ -122,10 +197,11 @@ def summarize_crime_risk(social_media_alert, cctv_output, lat, long, datetime_ob
     return "✅ No crime detected or possible at the location at the given time."
 
 # LangChain Tools for integration
-def setup_security_agent():
+def setup_security_agent(session_id="default"):
     cctv_monitoring_tool = Tool(
         name="CCTV Monitoring",
-        func=detect_suspicious_activity,
+        # The agent's Action Input is LLM text; never let it choose the video source
+        func=lambda _: detect_suspicious_activity(),
         description="Analyzes CCTV footage for suspicious activities."
     )
 
@@ -139,9 +215,10 @@ def setup_security_agent():
     security_agent = initialize_agent(
         tools=[cctv_monitoring_tool, social_media_tool],
         llm=llm,
-        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        # The conversational agent's prompt includes chat_history, so the session memory reaches the model
+        agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
         verbose=True,
-        memory=memory
+        memory=get_session_memory(session_id)
     )
     return security_agent
 
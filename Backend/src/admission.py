@@ -0,0 +1,64 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request would miss its queue deadline; retry_after is in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency pool with a queue for expensive requests.
+
+    Requests that would wait longer than queue_deadline are rejected up front instead of
+    piling up. Wait times are estimated from a moving average of recent request durations.
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_deadline, initial_duration=10.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_deadline = queue_deadline
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.avg_duration = initial_duration
+
+    def estimated_wait(self):
+        # Requests that must finish before a new one gets a slot
+        ahead = self.active + self.waiting - self.max_concurrent + 1
+        if ahead <= 0:
+            return 0.0
+        return math.ceil(ahead / self.max_concurrent) * self.avg_duration
+
+    def retry_after(self, wait):
+        return max(1, math.ceil(max(wait, self.avg_duration)))
+
+    @asynccontextmanager
+    async def admit(self):
+        wait = self.estimated_wait()
+        # Only requests that can't get a slot right away occupy the queue
+        queued = max(0, self.active + self.waiting - self.max_concurrent)
+        if queued >= self.max_queue or wait > self.queue_deadline:
+            raise AdmissionRejected(self.retry_after(wait))
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_deadline)
+        except asyncio.TimeoutError:
+            raise AdmissionRejected(self.retry_after(self.estimated_wait()))
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * (time.monotonic() - start)
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from SafetyPredictor import crime_model, add_cyclical_features
+from compiled_model import CompiledModel, export_model
+
+
+# Current path: one-row DataFrame through pandas and the full sklearn predict
+def sklearn_predict(lat, long, hour, month, day_of_week):
+    input_df = pd.DataFrame({
+        'Lat': lat,
+        'Long': long,
+        'HOUR': hour,
+        'MONTH': month,
+        'DAY_OF_WEEK': day_of_week
+    })
+    return crime_model.predict(add_cyclical_features(input_df))
+
+
+def random_inputs(n, rng):
+    return (
+        rng.uniform(42.22, 42.40, n),
+        rng.uniform(-71.20, -70.98, n),
+        rng.integers(0, 24, n),
+        rng.integers(1, 13, n),
+        rng.integers(0, 7, n)
+    )
+
+
+def time_per_call(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the compiled crime model against scikit-learn")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "crime_model_compiled.npz")
+        export_model(crime_model, path)
+        compiled = CompiledModel(path)
+
+    # Predictions must match exactly before timings mean anything
+    batch = random_inputs(args.rows, rng)
+    expected = sklearn_predict(*batch)
+    actual = compiled.predict_raw(*batch)
+    mismatches = int(np.sum(np.asarray(expected) != np.asarray(actual)))
+    print(f"Mismatches on {args.rows} rows: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+    row = tuple(values[:1] for values in batch)
+    single_sklearn = time_per_call(lambda: sklearn_predict(*row), args.repeats)
+    single_compiled = time_per_call(lambda: compiled.predict_raw(*row), args.repeats)
+    batch_sklearn = time_per_call(lambda: sklearn_predict(*batch), max(1, args.repeats // 20))
+    batch_compiled = time_per_call(lambda: compiled.predict_raw(*batch), max(1, args.repeats // 20))
+
+    print(f"Single row: sklearn {single_sklearn * 1e6:.1f} us, compiled {single_compiled * 1e6:.1f} us "
+          f"({single_sklearn / single_compiled:.1f}x)")
+    print(f"Batch of {args.rows}: sklearn {batch_sklearn * 1e3:.2f} ms, compiled {batch_compiled * 1e3:.2f} ms "
+          f"({batch_sklearn / batch_compiled:.1f}x)")
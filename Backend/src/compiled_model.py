@@ -0,0 +1,232 @@
+import argparse
+import io
+import json
+import os
+import warnings
+import numpy as np
+
+# Column order produced by add_cyclical_features in SafetyPredictor
+DEFAULT_FEATURES = ['Lat', 'Long', 'HOUR_SIN', 'HOUR_COS', 'MONTH_SIN', 'MONTH_COS', 'DAY_SIN', 'DAY_COS']
+
+# Synthetic rows compared against the original model before an export is written
+PARITY_CHECK_ROWS = 2000
+
+
+def _tree_estimators(model):
+    # Only models whose prediction is a plain average of their trees. Boosting (weighted votes) and
+    # Bagging (per-estimator feature subsets) would be evaluated wrongly, so they are not matched.
+    from sklearn.ensemble import (
+        ExtraTreesClassifier, ExtraTreesRegressor, RandomForestClassifier, RandomForestRegressor
+    )
+    from sklearn.tree import BaseDecisionTree
+
+    if isinstance(model, BaseDecisionTree):
+        return [model]
+    if isinstance(model, (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)):
+        return model.estimators_
+    return None
+
+
+def _is_linear(model):
+    # Linear models predict from coef_ and intercept_ alone. Poisson, Gamma and Tweedie regressors
+    # apply a link function on top, so they are not matched. Their base class is private and has
+    # moved between scikit-learn versions, so it is found by name.
+    from sklearn.svm import LinearSVC, LinearSVR
+
+    if any(cls.__name__ == "_GeneralizedLinearRegressor" for cls in type(model).__mro__):
+        return False
+    module = type(model).__module__
+    return module.startswith("sklearn.linear_model") or isinstance(model, (LinearSVC, LinearSVR))
+
+
+def _parity_inputs(arrays, n_features, rows):
+    # Spread tree inputs over the range of the split thresholds so every branch is exercised
+    rng = np.random.default_rng(0)
+    if "threshold" not in arrays:
+        return rng.normal(size=(rows, n_features))
+    X = np.zeros((rows, n_features))
+    split = arrays["left"] != -1
+    for column in range(n_features):
+        thresholds = arrays["threshold"][split & (arrays["feature"] == column)]
+        if len(thresholds):
+            low, high = thresholds.min(), thresholds.max()
+            margin = max(high - low, 1.0) * 0.1
+            X[:, column] = rng.uniform(low - margin, high + margin, rows)
+    return X
+
+
+def check_parity(model, compiled, X):
+    """Raise ValueError unless the compiled model predicts exactly what the original does on X"""
+    with warnings.catch_warnings():
+        # Fitted on a DataFrame; predicting on a bare array is fine since columns are in order
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        expected = np.asarray(model.predict(X))
+    actual = np.asarray(compiled.predict(X))
+    if compiled.classifier:
+        mismatches = int(np.sum(expected != actual))
+    else:
+        mismatches = int(np.sum(~np.isclose(expected.astype(np.float64), actual, rtol=1e-9, atol=1e-12)))
+    if mismatches:
+        raise ValueError(f"Compiled model disagrees with {type(model).__name__} on {mismatches} of {len(X)} rows")
+
+
+def export_model(model, path, check_rows=PARITY_CHECK_ROWS):
+    """Flatten a fitted scikit-learn model into plain arrays saved as an .npz file.
+
+    The export is checked against the model's own predictions first and nothing is written if they differ.
+    """
+    is_classifier = hasattr(model, "classes_")
+    feature_names = [str(name) for name in getattr(model, "feature_names_in_", DEFAULT_FEATURES)]
+    arrays = {}
+
+    trees = _tree_estimators(model)
+    if trees is not None:
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Multi-output models are not supported")
+
+        # All trees share one set of node arrays; child indices are offset into the global arrays
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in trees:
+            tree = estimator.tree_
+            leaf = tree.children_left == -1
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(leaf, -1, tree.children_left + offset))
+            rights.append(np.where(leaf, -1, tree.children_right + offset))
+            value = tree.value[:, 0, :].astype(np.float64)
+            if is_classifier:
+                # Leaf class counts (or fractions) become probabilities, as in predict_proba
+                totals = value.sum(axis=1, keepdims=True)
+                value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+
+        kind = "tree_ensemble"
+        arrays.update({
+            "feature": np.concatenate(features).astype(np.int32),
+            "threshold": np.concatenate(thresholds).astype(np.float64),
+            "left": np.concatenate(lefts).astype(np.int32),
+            "right": np.concatenate(rights).astype(np.int32),
+            "value": np.concatenate(values),
+            "roots": np.array(roots, dtype=np.int32),
+            "max_depth": np.array(max(e.tree_.max_depth for e in trees), dtype=np.int32)
+        })
+    elif _is_linear(model) and hasattr(model, "coef_") and hasattr(model, "intercept_"):
+        kind = "linear"
+        arrays.update({
+            "coef": np.atleast_1d(np.asarray(model.coef_, dtype=np.float64)),
+            "intercept": np.atleast_1d(np.asarray(model.intercept_, dtype=np.float64))
+        })
+    else:
+        raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+    meta = {"kind": kind, "classifier": is_classifier, "features": feature_names}
+    arrays["meta"] = np.array(json.dumps(meta))
+    if is_classifier:
+        arrays["classes"] = np.asarray(model.classes_)
+        if arrays["classes"].dtype == object:
+            arrays["classes"] = arrays["classes"].astype(str)
+
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    if check_rows:
+        buffer.seek(0)
+        check_parity(model, CompiledModel(buffer), _parity_inputs(arrays, len(feature_names), check_rows))
+
+    with open(path, 'wb') as f:
+        f.write(buffer.getvalue())
+    return meta
+
+
+class CompiledModel:
+    """Pure-NumPy evaluator for a model exported with export_model"""
+
+    def __init__(self, path):
+        data = np.load(path, allow_pickle=False)
+        meta = json.loads(str(data["meta"]))
+        self.kind = meta["kind"]
+        self.classifier = meta["classifier"]
+        self.features = meta["features"]
+        self.classes = data["classes"] if self.classifier else None
+
+        if self.kind == "tree_ensemble":
+            self.feature = data["feature"]
+            self.threshold = data["threshold"]
+            self.left = data["left"]
+            self.right = data["right"]
+            self.value = data["value"]
+            self.roots = data["roots"]
+            self.max_depth = int(data["max_depth"])
+        else:
+            self.coef = data["coef"]
+            self.intercept = data["intercept"]
+
+    def _tree_outputs(self, X):
+        # scikit-learn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+
+        # Walk every (row, tree) pair down one level per step
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            active = left != -1
+            if not active.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(active, np.where(go_left, left, self.right[nodes]), nodes)
+
+        # Sum tree outputs in estimator order, like scikit-learn, before averaging
+        leaf_values = self.value[nodes]
+        total = np.zeros((X.shape[0], self.value.shape[1]))
+        for t in range(len(self.roots)):
+            total += leaf_values[:, t]
+        return total / len(self.roots)
+
+    def predict(self, X):
+        """Predict for a 2D array whose columns follow self.features"""
+        if self.kind == "tree_ensemble":
+            outputs = self._tree_outputs(X)
+            if self.classifier:
+                return self.classes[np.argmax(outputs, axis=1)]
+            return outputs[:, 0]
+
+        scores = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        if not self.classifier:
+            return scores
+        if scores.ndim == 1 or scores.shape[1] == 1:
+            return self.classes[(scores.ravel() > 0).astype(int)]
+        return self.classes[np.argmax(scores, axis=1)]
+
+    def build_features(self, lat, long, hour, month, day_of_week):
+        """Same features as add_cyclical_features, computed on arrays without pandas"""
+        hour = np.atleast_1d(np.asarray(hour))
+        month = np.atleast_1d(np.asarray(month))
+        day_of_week = np.atleast_1d(np.asarray(day_of_week))
+        columns = {
+            'Lat': np.atleast_1d(np.asarray(lat, dtype=np.float64)),
+            'Long': np.atleast_1d(np.asarray(long, dtype=np.float64)),
+            'HOUR_SIN': np.sin(2 * np.pi * hour / 24),
+            'HOUR_COS': np.cos(2 * np.pi * hour / 24),
+            'MONTH_SIN': np.sin(2 * np.pi * (month - 1) / 12),
+            'MONTH_COS': np.cos(2 * np.pi * (month - 1) / 12),
+            'DAY_SIN': np.sin(2 * np.pi * day_of_week / 7),
+            'DAY_COS': np.cos(2 * np.pi * day_of_week / 7)
+        }
+        return np.column_stack(np.broadcast_arrays(*[columns[name] for name in self.features]))
+
+    def predict_raw(self, lat, long, hour, month, day_of_week):
+        return self.predict(self.build_features(lat, long, hour, month, day_of_week))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the crime model to a compact array format")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "crime_model_compiled.npz"))
+    args = parser.parse_args()
+
+    from SafetyPredictor import crime_model
+
+    meta = export_model(crime_model, args.output)
+    print(f"Exported {meta['kind']} crime model to {args.output}")
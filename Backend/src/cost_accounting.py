@@ -0,0 +1,115 @@
+import contextvars
+import threading
+import time
+from collections import Counter, deque
+
+# Conversation that upstream calls are billed to; copied into tasks and worker threads
+current_conversation = contextvars.ContextVar("current_conversation", default=None)
+
+METRICS = ("tokens", "maps_requests", "maps_elements")
+
+# Service levels, from full service down to no upstream calls at all
+FULL = "full"
+REDUCED = "reduced"
+MINIMAL = "minimal"
+EXHAUSTED = "exhausted"
+
+
+class QuotaExceeded(Exception):
+    """Raised when the shared upstream budget for the current window is spent"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Upstream budget exhausted, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class CostLedger:
+    """Counts OpenAI tokens and Maps requests/elements per conversation and per time window.
+
+    Limits are dicts keyed by metric name; a metric without a limit is counted but not enforced.
+    """
+
+    def __init__(self, conversation_limits, window_limits, window_seconds=3600,
+                 reduced_below=0.5, minimal_below=0.2):
+        self.conversation_limits = conversation_limits
+        self.window_limits = window_limits
+        self.window_seconds = window_seconds
+        self.reduced_below = reduced_below
+        self.minimal_below = minimal_below
+        self.conversations = {}
+        self.active = set()  # conversations that may still be billed
+        self.window = deque()  # (timestamp, metric, amount)
+        self.window_totals = Counter()
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        cutoff = now - self.window_seconds
+        while self.window and self.window[0][0] < cutoff:
+            _, metric, amount = self.window.popleft()
+            self.window_totals[metric] -= amount
+
+    def record(self, metric, amount=1, conversation_id=None):
+        conversation_id = conversation_id or current_conversation.get()
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            self.window.append((now, metric, amount))
+            self.window_totals[metric] += amount
+            # Late calls for a released conversation (e.g. a cancelled prefetch) only count toward the window
+            if conversation_id in self.active:
+                self.conversations.setdefault(conversation_id, Counter())[metric] += amount
+
+    def usage(self, conversation_id=None):
+        conversation_id = conversation_id or current_conversation.get()
+        with self.lock:
+            return dict(self.conversations.get(conversation_id, Counter()))
+
+    def window_usage(self):
+        with self.lock:
+            self._expire(time.monotonic())
+            return dict(self.window_totals)
+
+    def track(self, conversation_id):
+        """Start billing upstream calls to a conversation"""
+        with self.lock:
+            self.active.add(conversation_id)
+
+    def release(self, conversation_id):
+        """Stop tracking a finished conversation and return what it spent"""
+        with self.lock:
+            self.active.discard(conversation_id)
+            return dict(self.conversations.pop(conversation_id, Counter()))
+
+    def remaining_fraction(self, conversation_id=None):
+        """Smallest share of budget left across the conversation and window quotas"""
+        conversation_id = conversation_id or current_conversation.get()
+        with self.lock:
+            self._expire(time.monotonic())
+            spent = self.conversations.get(conversation_id, Counter())
+            fractions = [1.0]
+            for used, limits in ((spent, self.conversation_limits), (self.window_totals, self.window_limits)):
+                for metric, limit in limits.items():
+                    if limit:
+                        fractions.append(1 - used[metric] / limit)
+            return max(0.0, min(fractions))
+
+    def window_exhausted(self):
+        with self.lock:
+            self._expire(time.monotonic())
+            return any(limit and self.window_totals[metric] >= limit for metric, limit in self.window_limits.items())
+
+    def service_level(self, conversation_id=None):
+        remaining = self.remaining_fraction(conversation_id)
+        if remaining <= 0:
+            return EXHAUSTED
+        if remaining < self.minimal_below:
+            return MINIMAL
+        if remaining < self.reduced_below:
+            return REDUCED
+        return FULL
+
+    def seconds_until_reset(self):
+        with self.lock:
+            if not self.window:
+                return 1
+            return max(1, int(self.window[0][0] + self.window_seconds - time.monotonic()) + 1)
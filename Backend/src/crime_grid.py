@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Axis sizes for the time dimensions of the grid
+HOURS = 24
+MONTHS = 12
+DAYS = 7
+
+# Default region (Boston) used by the offline job
+DEFAULT_LAT_RANGE = (42.22, 42.40)
+DEFAULT_LONG_RANGE = (-71.20, -70.98)
+DEFAULT_STEP = 0.002
+
+
+def _meta_path(grid_path):
+    return os.path.splitext(grid_path)[0] + ".json"
+
+
+def _axis(start, stop, step):
+    count = int(round((stop - start) / step)) + 1
+    return start + np.arange(count) * step
+
+
+def build_crime_grid(model, featurize, grid_path, lat_range=DEFAULT_LAT_RANGE,
+                     long_range=DEFAULT_LONG_RANGE, step=DEFAULT_STEP):
+    """Evaluate the crime model over lat x long x hour x month x day and store it as a .npy file"""
+    lats = _axis(lat_range[0], lat_range[1], step)
+    longs = _axis(long_range[0], long_range[1], step)
+
+    # Every (hour, month, day) combination, in the same order as the grid axes
+    hours, months, days = np.meshgrid(
+        np.arange(HOURS), np.arange(1, MONTHS + 1), np.arange(DAYS), indexing="ij"
+    )
+    time_block = pd.DataFrame({
+        'HOUR': hours.ravel(),
+        'MONTH': months.ravel(),
+        'DAY_OF_WEEK': days.ravel()
+    })
+
+    labels = {}
+    grid = np.lib.format.open_memmap(
+        grid_path, mode="w+", dtype=np.int16,
+        shape=(len(lats), len(longs), HOURS, MONTHS, DAYS)
+    )
+
+    # Predict one latitude row at a time so memory stays bounded for large regions
+    for i, lat in enumerate(lats):
+        rows = pd.concat([time_block] * len(longs), ignore_index=True)
+        rows.insert(0, 'Long', np.repeat(longs, len(time_block)))
+        rows.insert(0, 'Lat', lat)
+        rows = rows[['Lat', 'Long', 'HOUR', 'MONTH', 'DAY_OF_WEEK']]
+
+        predictions = model.predict(featurize(rows))
+        codes = np.array([labels.setdefault(p, len(labels)) for p in predictions.tolist()], dtype=np.int16)
+        grid[i] = codes.reshape(len(longs), HOURS, MONTHS, DAYS)
+        print(f"Crime grid row {i + 1}/{len(lats)} done")
+
+    grid.flush()
+    del grid
+
+    meta = {
+        "lat_start": float(lats[0]),
+        "long_start": float(longs[0]),
+        "step": float(step),
+        "shape": [len(lats), len(longs), HOURS, MONTHS, DAYS],
+        "labels": [label for label, _ in sorted(labels.items(), key=lambda item: item[1])]
+    }
+    with open(_meta_path(grid_path), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    return meta
+
+
+class CrimeRiskGrid:
+    """Read-only view over a precomputed crime grid, shared through the OS page cache"""
+
+    def __init__(self, grid_path):
+        with open(_meta_path(grid_path), 'r') as f:
+            meta = json.load(f)
+
+        self.grid = np.load(grid_path, mmap_mode="r")
+        self.lat_start = meta["lat_start"]
+        self.long_start = meta["long_start"]
+        self.step = meta["step"]
+        self.labels = meta["labels"]
+        self.n_lat, self.n_long = self.grid.shape[:2]
+
+    def _position(self, lat, long):
+        return (lat - self.lat_start) / self.step, (long - self.long_start) / self.step
+
+    def contains(self, lat, long):
+        y, x = self._position(lat, long)
+        return 0 <= y <= self.n_lat - 1 and 0 <= x <= self.n_long - 1
+
+    def lookup(self, lat, long, hour, month, day_of_week, method="nearest"):
+        """Return the predicted label for a location and time slot, or None outside the grid"""
+        if not self.contains(lat, long):
+            return None
+
+        y, x = self._position(lat, long)
+        hour, month_idx, day = int(hour) % HOURS, int(month) - 1, int(day_of_week)
+
+        if method == "nearest":
+            code = self.grid[int(round(y)), int(round(x)), hour, month_idx, day]
+            return self.labels[code]
+
+        if method != "bilinear":
+            raise ValueError(f"Unknown lookup method: {method}")
+
+        # Labels are categorical, so bilinear lookup is a vote weighted by distance to the 4 corners
+        y0, x0 = min(int(y), self.n_lat - 2), min(int(x), self.n_long - 2)
+        y0, x0 = max(y0, 0), max(x0, 0)
+        dy, dx = y - y0, x - x0
+        weights = {}
+        for cy, cx, w in (
+            (y0, x0, (1 - dy) * (1 - dx)),
+            (y0, x0 + 1, (1 - dy) * dx),
+            (y0 + 1, x0, dy * (1 - dx)),
+            (y0 + 1, x0 + 1, dy * dx),
+        ):
+            if cy >= self.n_lat or cx >= self.n_long:
+                continue
+            code = int(self.grid[cy, cx, hour, month_idx, day])
+            weights[code] = weights.get(code, 0.0) + w
+
+        return self.labels[max(weights, key=weights.get)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the crime risk grid for a region")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "crime_grid.npy"))
+    parser.add_argument("--lat-range", type=float, nargs=2, default=DEFAULT_LAT_RANGE)
+    parser.add_argument("--long-range", type=float, nargs=2, default=DEFAULT_LONG_RANGE)
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP)
+    args = parser.parse_args()
+
+    from SafetyPredictor import crime_model, add_cyclical_features
+
+    meta = build_crime_grid(crime_model, add_cyclical_features, args.output,
+                            tuple(args.lat_range), tuple(args.long_range), args.step)
+    print(f"Saved crime grid {meta['shape']} to {args.output}")
@@ -0,0 +1,72 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import List, Optional
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+# Parsed JSON files, keyed by path and invalidated when the file changes
+json_file_cache = {}
+
+
+def read_json_cached(path):
+    """json.load a file, re-reading it only when its modification time or size changes"""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = json_file_cache.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, 'r') as f:
+            cached = (key, json.load(f))
+        json_file_cache[path] = cached
+    return cached[1]
+
+
+def project_fields(items: List[dict], fields: Optional[str]) -> List[dict]:
+    """Keep only the comma-separated fields (e.g. "name,address") of each item"""
+    if not fields:
+        return items
+    wanted = [field.strip() for field in fields.split(',') if field.strip()]
+    return [{field: item[field] for field in wanted if field in item} for item in items]
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    accepted = [part.split(';')[0].strip().lower() for part in request.headers.get("accept-encoding", "").split(',')]
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def json_response(request: Request, payload, etag: bool = True, status_code: int = 200) -> Response:
+    """Serialize with orjson, answer If-None-Match with 304 and compress for the client"""
+    body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    headers = {"Vary": "Accept-Encoding"}
+
+    if etag:
+        tag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        # Weak tag: it describes the uncompressed body, so it holds across content encodings
+        headers["ETag"] = "W/" + tag
+        headers["Cache-Control"] = "no-cache"
+        if_none_match = request.headers.get("if-none-match", "")
+        if tag in [t.strip().removeprefix("W/") for t in if_none_match.split(',')] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(request) if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding == "br":
+        body = brotli.compress(body)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,70 @@
+import json
+import re
+
+
+class JsonArrayStreamParser:
+    """Incrementally parses a streamed JSON object and returns the elements of one array as they close"""
+
+    def __init__(self, key):
+        self.key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self.buffer = ""
+        self.pos = 0
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.start = None
+
+    def feed(self, chunk):
+        """Add a chunk of text and return the array elements completed by it"""
+        items = []
+        if self.finished or not chunk:
+            return items
+
+        self.buffer += chunk
+        if not self.in_array:
+            match = self.key_pattern.search(self.buffer)
+            if not match:
+                return items
+            self.in_array = True
+            self.buffer = self.buffer[match.end():]
+            self.pos = 0
+
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0:
+                    self.start = self.pos
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0:
+                    # Closing bracket of the array itself
+                    self.finished = True
+                    break
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        items.append(json.loads(self.buffer[self.start:self.pos + 1]))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed array element: {str(e)}")
+                    self.start = None
+            self.pos += 1
+
+        # Keep only the unfinished element in the buffer
+        cut = self.start if self.start is not None else self.pos
+        self.buffer = self.buffer[cut:]
+        self.pos -= cut
+        if self.start is not None:
+            self.start = 0
+
+        return items
@@ -0,0 +1,267 @@
+import asyncio
+import datetime
+from typing import List, Optional, Union
+from SafetyPredictor import (
+    analyze_social_media,
+    detect_objects,
+    frame_signature,
+    read_frame,
+    summarize_crime_risk
+)
+
+# Defaults for the monitoring loop
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_CHECK_INTERVAL = 60  # seconds between checks of the same event
+SCHEDULER_TICK = 1  # seconds between scans of the registry
+STATUS_RETENTION = datetime.timedelta(hours=1)  # how long finished events stay visible
+
+
+def public_status(status):
+    return {key: value.isoformat() if isinstance(value, datetime.datetime) else value for key, value in status.items()}
+
+
+def local_naive(value):
+    """The scheduler and the crime model work in naive local time; convert aware datetimes to it"""
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def validate_cctv_source(source):
+    """Only camera indexes and network streams can be monitored, never local file paths"""
+    if source is None or isinstance(source, int):
+        return source
+    if str(source).isdigit():
+        return int(source)
+    if str(source).lower().startswith(("rtsp://", "http://", "https://")):
+        return str(source)
+    raise ValueError("cctv_source must be a camera index or an rtsp/http(s) stream URL")
+
+
+class MonitoredEvent:
+    def __init__(self, event_id, lat, long, start, end, cctv_source=None, tweets=None, interval=DEFAULT_CHECK_INTERVAL):
+        self.event_id = event_id
+        self.lat = lat
+        self.long = long
+        self.start = start
+        self.end = end
+        self.cctv_source = cctv_source
+        self.tweets = list(tweets or [])
+        self.interval = interval
+        self.next_check = start
+        self.fingerprint = None
+
+
+class SecurityMonitor:
+    """Runs periodic security checks for many booked events on one event loop.
+
+    All checks share the YOLO and crime models loaded by SafetyPredictor. Blocking work runs in
+    threads, limited by a semaphore, and checks whose inputs haven't changed are skipped.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.events = {}
+        self.statuses = {}
+        self.in_flight = set()
+        self.check_tasks = set()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.task = None
+
+    def register(self, event_id, lat, long, start, end, cctv_source=None, tweets=None, interval=DEFAULT_CHECK_INTERVAL):
+        cctv_source = validate_cctv_source(cctv_source)
+        start, end = local_naive(start), local_naive(end)
+        if end <= start:
+            raise ValueError("end must be after start")
+        self.events[event_id] = MonitoredEvent(event_id, lat, long, start, end, cctv_source, tweets, interval)
+        self.statuses[event_id] = {"event_id": event_id, "status": "scheduled", "summary": None, "checked_at": None}
+
+    def update_tweets(self, event_id, tweets):
+        self.events[event_id].tweets = list(tweets)
+
+    def unregister(self, event_id):
+        self.events.pop(event_id, None)
+        self.statuses.pop(event_id, None)
+
+    def get_status(self, event_id):
+        status = self.statuses.get(event_id)
+        return None if status is None else public_status(status)
+
+    def all_statuses(self):
+        return [public_status(status) for status in self.statuses.values()]
+
+    async def check_event(self, event, now):
+        async with self.semaphore:
+            frame = None
+            if event.cctv_source is not None:
+                frame = await asyncio.to_thread(read_frame, event.cctv_source)
+
+            # The crime prediction depends on the hour, so a new hour counts as a change
+            fingerprint = (tuple(event.tweets), frame_signature(frame), now.hour)
+            status = self.statuses.get(event.event_id)
+            if status is None:
+                return
+
+            # Nothing new to analyze since the last check
+            if fingerprint == event.fingerprint:
+                status["checked_at"] = now.isoformat()
+                return
+
+            social_media_alert = await asyncio.to_thread(analyze_social_media, event.tweets)
+            cctv_output = await asyncio.to_thread(detect_objects, frame) if frame is not None else []
+            summary = await asyncio.to_thread(
+                summarize_crime_risk, social_media_alert, cctv_output, event.lat, event.long, now
+            )
+
+            event.fingerprint = fingerprint
+            status.update({
+                "status": "alert" if summary.startswith("🚨") else "clear",
+                "summary": summary,
+                "checked_at": now.isoformat()
+            })
+
+    async def run_check(self, event, now):
+        try:
+            await self.check_event(event, now)
+        except Exception as e:
+            print(f"Error checking event {event.event_id}: {str(e)}")
+        finally:
+            self.in_flight.discard(event.event_id)
+
+    async def run(self):
+        while True:
+            now = datetime.datetime.now()
+            for event in list(self.events.values()):
+                # One bad event must not stop monitoring for the others
+                try:
+                    self.schedule(event, now)
+                except Exception as e:
+                    print(f"Error scheduling event {event.event_id}: {str(e)}")
+
+            try:
+                self.expire_statuses(now)
+            except Exception as e:
+                print(f"Error expiring event statuses: {str(e)}")
+            await asyncio.sleep(SCHEDULER_TICK)
+
+    def schedule(self, event, now):
+        # Events that are over are dropped from the registry
+        if now > event.end:
+            self.events.pop(event.event_id, None)
+            if event.event_id in self.statuses:
+                self.statuses[event.event_id]["status"] = "finished"
+                self.statuses[event.event_id]["finished_at"] = now
+            return
+
+        if now < event.next_check or event.event_id in self.in_flight:
+            return
+
+        event.next_check = now + datetime.timedelta(seconds=event.interval)
+        self.in_flight.add(event.event_id)
+        task = asyncio.create_task(self.run_check(event, now))
+        self.check_tasks.add(task)
+        task.add_done_callback(self.check_tasks.discard)
+
+    def expire_statuses(self, now):
+        # Finished events are kept for a while so clients can read the final status, then dropped
+        for event_id, status in list(self.statuses.items()):
+            finished_at = status.get("finished_at")
+            if finished_at is not None and now - finished_at > STATUS_RETENTION:
+                del self.statuses[event_id]
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+def create_monitor_router(monitor):
+    """FastAPI routes to register events and read the latest risk status per event"""
+    from fastapi import APIRouter, HTTPException
+    from pydantic import BaseModel
+
+    class EventRegistration(BaseModel):
+        event_id: str
+        lat: float
+        long: float
+        start: datetime.datetime
+        end: datetime.datetime
+        cctv_source: Optional[Union[int, str]] = None
+        tweets: List[str] = []
+        interval: int = DEFAULT_CHECK_INTERVAL
+
+    class TweetsUpdate(BaseModel):
+        tweets: List[str]
+
+    router = APIRouter()
+
+    @router.post("/security/events")
+    async def register_event(event: EventRegistration):
+        try:
+            monitor.register(event.event_id, event.lat, event.long, event.start, event.end,
+                             event.cctv_source, event.tweets, event.interval)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return monitor.get_status(event.event_id)
+
+    @router.put("/security/events/{event_id}/tweets")
+    async def update_event_tweets(event_id: str, update: TweetsUpdate):
+        if event_id not in monitor.events:
+            raise HTTPException(status_code=404, detail=f"Event '{event_id}' is not monitored")
+        monitor.update_tweets(event_id, update.tweets)
+        return {"message": "Tweets updated"}
+
+    @router.delete("/security/events/{event_id}")
+    async def unregister_event(event_id: str):
+        if monitor.get_status(event_id) is None:
+            raise HTTPException(status_code=404, detail=f"Event '{event_id}' is not monitored")
+        monitor.unregister(event_id)
+        return {"message": "Event unregistered"}
+
+    @router.get("/security/status")
+    async def get_all_statuses():
+        return {"events": monitor.all_statuses()}
+
+    @router.get("/security/status/{event_id}")
+    async def get_event_status(event_id: str):
+        status = monitor.get_status(event_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail=f"Event '{event_id}' is not monitored")
+        return status
+
+    return router
+
+
+def create_monitor_app(monitor=None):
+    """Standalone FastAPI app for the monitor, kept out of main.py so the API doesn't load YOLO"""
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+
+    monitor = monitor or SecurityMonitor()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        monitor.start()
+        yield
+        await monitor.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(create_monitor_router(monitor))
+    return app
+
+
+# Run from Backend/src with: uvicorn security_monitor:app --port 8001
+app = create_monitor_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8001)
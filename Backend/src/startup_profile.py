@@ -0,0 +1,92 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cheap endpoints that don't call upstream APIs, used to measure first-request latency
+DEFAULT_ENDPOINTS = [
+    "/weather-report",
+    "/random-accessibility-features",
+    "/api/saved-venues",
+    "/generate-random-places"
+]
+
+
+def profile_imports(module="main"):
+    """Import the module in a fresh interpreter with -X importtime.
+
+    Returns (total_us, {name: cumulative_us}) for the modules the module imports directly, so
+    dependencies pulled in by another package are counted once, inside that package.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    # Lines are "import time: self [us] | cumulative | imported package", with the package name
+    # indented two spaces per level of nesting. A module is listed after everything it imports.
+    total_us, direct, pending = 0, {}, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name_column = line[len("import time:"):].split("|")
+        name = name_column.strip()
+        depth = (len(name_column) - len(name_column.lstrip()) - 1) // 2
+        if depth == 1:
+            pending[name] = int(cumulative_us)
+        elif depth == 0:
+            if name == module:
+                total_us, direct = int(cumulative_us), pending
+            pending = {}
+
+    return total_us, direct
+
+
+def profile_first_requests(endpoints):
+    """Time the first and second call of each endpoint in-process, including app startup"""
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from fastapi.testclient import TestClient
+    from main import app
+
+    timings = {}
+    start = time.perf_counter()
+    with TestClient(app) as test_client:
+        timings["startup"] = (time.perf_counter() - start, None)
+        for endpoint in endpoints:
+            first_start = time.perf_counter()
+            test_client.get(endpoint)
+            first = time.perf_counter() - first_start
+            second_start = time.perf_counter()
+            test_client.get(endpoint)
+            timings[endpoint] = (first, time.perf_counter() - second_start)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import and first-request latency of the API")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest top-level imports to show")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if importing main takes longer")
+    parser.add_argument("--endpoints", nargs="*", default=DEFAULT_ENDPOINTS)
+    args = parser.parse_args()
+
+    total_us, top_level = profile_imports()
+    print(f"Importing main: {total_us / 1000:.1f} ms")
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<30} {us / 1000:8.1f} ms")
+
+    print("First-request latency:")
+    for endpoint, (first, second) in profile_first_requests(args.endpoints).items():
+        if second is None:
+            print(f"  {endpoint:<30} {first * 1000:8.1f} ms")
+        else:
+            print(f"  {endpoint:<30} {first * 1000:8.1f} ms first, {second * 1000:8.1f} ms after")
+
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"Import time exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
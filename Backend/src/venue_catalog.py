@@ -0,0 +1,249 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+
+# Fields that describe one request (a date, a budget, live traffic) rather than the venue itself
+REQUEST_FIELDS = {
+    "date", "time", "budget", "attendees", "traffic", "weather_data", "safety_data", "accessibility_score"
+}
+
+# Words that don't tell event types apart ("Large-scale conferences", "Sports events")
+EVENT_TYPE_STOPWORDS = {"and", "or", "the", "of", "a", "event", "events", "large", "scale", "small"}
+
+# Size of the geo buckets, in degrees (about 1 km)
+GEO_CELL = 0.01
+
+ADDRESS_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "boulevard": "blvd", "road": "rd", "drive": "dr",
+    "place": "pl", "square": "sq", "suite": "ste", "north": "n", "south": "s", "east": "e", "west": "w"
+}
+
+
+def normalize_text(text):
+    return re.sub(r'[^a-z0-9 ]+', ' ', str(text or '').lower()).split()
+
+
+def event_type_words(event_type):
+    """Singular content words of an event type, so "Private parties" and "party" both give party"""
+    words = set()
+    for word in normalize_text(event_type):
+        if word in EVENT_TYPE_STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith(('ches', 'shes', 'xes')):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+
+def normalize_key(venue):
+    """Identity of a venue: its name plus the street part of its address, normalized"""
+    name = ' '.join(word for word in normalize_text(venue.get('name')) if word != 'the')
+    street = str(venue.get('address', '')).split(',')[0]
+    street = ' '.join(ADDRESS_ABBREVIATIONS.get(word, word) for word in normalize_text(street))
+    return f"{name}|{street}"
+
+
+def venue_city(venue):
+    parts = str(venue.get('address', '')).split(',')
+    return parts[1].strip().lower() if len(parts) > 1 else None
+
+
+def parse_capacity(capacity):
+    """(min, max) attendees from text such as "Up to 120" or "50-200 guests"; None when unknown"""
+    numbers = [int(n) for n in re.findall(r'\d+', str(capacity or '').replace(',', ''))]
+    if not numbers:
+        return None
+    return (min(numbers) if len(numbers) > 1 else 0, max(numbers))
+
+
+def parse_cost(cost):
+    """Lowest dollar amount in text such as "Starting from $10,000 per day"; None when unknown"""
+    amounts = [int(n) for n in re.findall(r'\$\s*(\d+)', str(cost or '').replace(',', ''))]
+    return min(amounts) if amounts else None
+
+
+def venue_coordinates(venue):
+    location = venue.get('location') if isinstance(venue.get('location'), dict) else venue
+    lat, lng = location.get('lat'), location.get('lng')
+    if lat is None or lng is None:
+        return None
+    return float(lat), float(lng)
+
+
+def haversine_km(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 12742 * math.asin(math.sqrt(h))
+
+
+class VenueCatalog:
+    """Canonical store of every venue seen, deduplicated and indexed for local recommendations.
+
+    Venues come from LLM results, place_data.json and saved venues. Records are merged by
+    normalized name and street address, and indexed by city, event type, text tokens and
+    geo cell. The catalog is persisted as JSON and loaded on first use.
+    """
+
+    def __init__(self, path, seed_files=()):
+        self.path = path
+        self.seed_files = seed_files
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.load_failed = False  # The catalog file exists but couldn't be read; never save over it
+        self.venues = {}
+        self.by_city = defaultdict(set)
+        self.by_event_type = defaultdict(set)
+        self.by_token = defaultdict(set)
+        self.by_cell = defaultdict(set)
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r') as f:
+                        venues = json.load(f).get('venues', [])
+                except (OSError, ValueError) as e:
+                    # Leave the file alone so it can be repaired; try again on the next call
+                    print(f"Error loading venue catalog from {self.path}: {str(e)}")
+                    self.load_failed = True
+                    return
+                for venue in venues:
+                    self._add(venue)
+                self.load_failed = False
+                self.loaded = True
+                return
+
+            # First run: build the catalog from the existing flat files
+            for seed_file, list_key in self.seed_files:
+                try:
+                    with open(seed_file, 'r') as f:
+                        self._absorb(json.load(f).get(list_key, []))
+                except (OSError, ValueError) as e:
+                    print(f"Error seeding venue catalog from {seed_file}: {str(e)}")
+            self.load_failed = False
+            self.loaded = True
+            self.save()
+
+    def _index(self, key, venue):
+        city = venue_city(venue)
+        if city:
+            self.by_city[city].add(key)
+        for event_type in venue.get('event_types', []):
+            for word in event_type_words(event_type):
+                self.by_event_type[word].add(key)
+        text = ' '.join([str(venue.get('name', '')), str(venue.get('address', '')), ' '.join(map(str, venue.get('features', [])))])
+        for token in normalize_text(text):
+            self.by_token[token].add(key)
+        coordinates = venue_coordinates(venue)
+        if coordinates:
+            self.by_cell[(math.floor(coordinates[0] / GEO_CELL), math.floor(coordinates[1] / GEO_CELL))].add(key)
+
+    def _add(self, venue):
+        key = normalize_key(venue)
+        existing = self.venues.get(key)
+        if existing is None:
+            merged = dict(venue)
+        else:
+            # Keep what we already know and fill in anything new
+            merged = dict(existing)
+            for field, value in venue.items():
+                if field == 'features':
+                    merged['features'] = list(dict.fromkeys(list(existing.get('features', [])) + list(value)))
+                elif field != 'event_types' and value and not merged.get(field):
+                    merged[field] = value
+        merged['event_types'] = sorted(set(merged.get('event_types', [])) | set(venue.get('event_types', [])))
+        self.venues[key] = merged
+        self._index(key, merged)
+        return key
+
+    def absorb(self, venues, event_type=None, save=True):
+        """Merge venues from any source into the catalog"""
+        self.ensure_loaded()
+        with self.lock:
+            self._absorb(venues, event_type)
+            if save:
+                self.save()
+
+    def _absorb(self, venues, event_type=None):
+        for venue in venues:
+            if not venue.get('name') or not venue.get('address') or venue.get('name') == 'Error':
+                continue
+            record = {field: value for field, value in venue.items() if field not in REQUEST_FIELDS}
+            if not record.get('source') and record.get('website'):
+                record['source'] = record['website']
+            event_types = {e.lower() for e in record.pop('event_types', [])}
+            for value in (record.pop('event_type', None), event_type):
+                if value:
+                    event_types.add(value.strip().lower())
+            record['event_types'] = sorted(event_types)
+            self._add(record)
+
+    def save(self):
+        with self.lock:
+            if self.load_failed:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({"venues": list(self.venues.values())}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def search(self, city=None, event_type=None, min_capacity=None, max_capacity=None, max_cost=None,
+               text=None, near=None, radius_km=5.0, limit=None):
+        """Venues matching every given filter, smallest fitting capacity first.
+
+        Capacity and cost filters skip venues whose capacity or cost is unknown.
+        """
+        self.ensure_loaded()
+        with self.lock:
+            candidates = None
+
+            def narrow(keys):
+                nonlocal candidates
+                candidates = set(keys) if candidates is None else candidates & keys
+
+            if city:
+                narrow(self.by_city.get(city.split(',')[0].strip().lower(), set()))
+            words = event_type_words(event_type)
+            if words:
+                # Any word of the requested type matches: "birthday party" finds party venues
+                narrow(set().union(*(self.by_event_type.get(word, set()) for word in words)))
+            for token in normalize_text(text):
+                narrow(self.by_token.get(token, set()))
+            if near:
+                lat_cells = math.ceil(radius_km / 111 / GEO_CELL)
+                lng_cells = math.ceil(radius_km / (111 * max(math.cos(math.radians(near[0])), 0.01)) / GEO_CELL)
+                cell_lat, cell_lng = math.floor(near[0] / GEO_CELL), math.floor(near[1] / GEO_CELL)
+                keys = set()
+                for dlat in range(-lat_cells, lat_cells + 1):
+                    for dlng in range(-lng_cells, lng_cells + 1):
+                        keys |= self.by_cell.get((cell_lat + dlat, cell_lng + dlng), set())
+                narrow({key for key in keys if haversine_km(near, venue_coordinates(self.venues[key])) <= radius_km})
+
+            keys = self.venues.keys() if candidates is None else candidates
+            results = []
+            for key in keys:
+                venue = self.venues[key]
+                capacity = parse_capacity(venue.get('capacity'))
+                if min_capacity is not None and (capacity is None or capacity[1] < min_capacity):
+                    continue
+                if max_capacity is not None and (capacity is None or capacity[1] > max_capacity):
+                    continue
+                if max_cost is not None:
+                    cost = parse_cost(venue.get('estimated_cost'))
+                    if cost is None or cost > max_cost:
+                        continue
+                results.append((capacity[1] if capacity else math.inf, venue.get('name', ''), venue))
+
+            results.sort(key=lambda item: (item[0], item[1]))
+            return [dict(venue) for _, _, venue in results[:limit]]